@@ -1,7 +1,15 @@
+import atexit
+from dotenv import load_dotenv
+
+# Load the .env file once, before any module below reads os.environ at import time
+load_dotenv()
+
 from flask import Flask
 from app.config import load_configurations, configure_logging
 from .views import webhook_blueprint
-from app.utils.whatsapp_utils import init_whatsapp_config
+from app.utils.whatsapp_utils import init_whatsapp_config, close_whatsapp_client
+from app.utils.event_loop import run_coroutine
+from app.services.odoo_integration import close_odoo_client
 
 def create_app():
     app = Flask(__name__)
@@ -16,4 +24,8 @@ def create_app():
     # Import and register blueprints, if any
     app.register_blueprint(webhook_blueprint)
     
+    # Close shared async HTTP clients on shutdown
+    atexit.register(lambda: run_coroutine(close_odoo_client(), timeout=5))
+    atexit.register(lambda: run_coroutine(close_whatsapp_client(), timeout=5))
+    
     return app
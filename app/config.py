@@ -1,11 +1,9 @@
 import sys
 import os
-from dotenv import load_dotenv
 import logging
 
 
 def load_configurations(app):
-    load_dotenv()
     app.config["ACCESS_TOKEN"] = os.getenv("ACCESS_TOKEN")
     app.config["YOUR_PHONE_NUMBER"] = os.getenv("YOUR_PHONE_NUMBER")
     app.config["APP_ID"] = os.getenv("APP_ID")
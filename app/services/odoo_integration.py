@@ -1,11 +1,81 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
 import os
 import logging
-from dotenv import load_dotenv
 
-# Cargar variables de entorno
-load_dotenv()
+# URL del webhook de tickets, leída y validada una sola vez al importar el módulo
+ODOO_WEBHOOK_URL_TICKETS = os.getenv("ODOO_WEBHOOK_URL_TICKETS") or None
+if ODOO_WEBHOOK_URL_TICKETS is None:
+    logging.error("Variable de entorno ODOO_WEBHOOK_URL_TICKETS no configurada")
+
+# Cliente asíncrono compartido: mantiene abiertas las conexiones con Odoo
+# para no repetir el handshake TCP/TLS en cada ticket
+_odoo_client = httpx.AsyncClient(
+    timeout=15,
+    headers={"Accept": "application/json"},
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
+# Sesión síncrona compartida con el mismo propósito. Los reintentos solo cubren
+# errores de conexión: urllib3 no reintenta un POST que ya llegó al servidor,
+# así que no se pueden crear tickets duplicados
+_odoo_session = requests.Session()
+_odoo_session.headers.update({
+    "Content-Type": "application/json",
+    "Accept": "application/json"
+})
+_odoo_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+
+def _build_ticket_payload(customer_name, customer_phone, customer_email, subject, description):
+    """
+    Construye el payload del ticket según el formato requerido por Odoo.
+    
+    Returns:
+        dict: Payload listo para enviarse al webhook
+    """
+    return {
+        "team_id": 1,
+        "name": subject,
+        "partner_name": customer_name,
+        "partner_phone": customer_phone,
+        "partner_email": customer_email,
+        "description": description
+    }
+
+
+def _ticket_result(response, subject):
+    """
+    Convierte la respuesta del webhook de Odoo en el resultado de la creación del ticket.
+    Acepta respuestas de requests y de httpx, que exponen la misma interfaz.
+    
+    Args:
+        response: Respuesta HTTP del webhook
+        subject (str): Asunto del ticket, usado en los logs
+        
+    Returns:
+        dict: Resultado de la creación del ticket
+    """
+    if response.status_code in [200, 201]:
+        logging.info(f"Ticket creado exitosamente en Odoo: {subject}")
+        return {
+            "success": True,
+            "message": "Ticket creado exitosamente",
+            "data": response.json() if response.text else {}
+        }
+    
+    logging.error(f"Error al crear ticket en Odoo. Status: {response.status_code}, Respuesta: {response.text}")
+    return {
+        "success": False,
+        "error": f"Error al crear ticket (código {response.status_code})",
+        "details": response.text
+    }
+
 
 def create_odoo_ticket(customer_name, customer_phone, customer_email, subject, description):
     """
@@ -21,54 +91,21 @@ def create_odoo_ticket(customer_name, customer_phone, customer_email, subject, d
     Returns:
         dict: Respuesta del webhook de Odoo o mensaje de error
     """
-    # Obtener la URL del webhook desde las variables de entorno
-    odoo_webhook_url = os.getenv("ODOO_WEBHOOK_URL_TICKETS")
-    
-    if not odoo_webhook_url:
-        logging.error("Variable de entorno ODOO_WEBHOOK_URL_TICKETS no configurada")
+    if ODOO_WEBHOOK_URL_TICKETS is None:
         return {"error": "URL del webhook de Odoo no configurada"}
     
-    # Preparar el payload según el formato requerido por Odoo
-    payload = {
-        "team_id": 1,
-        "name": subject,
-        "partner_name": customer_name,
-        "partner_phone": customer_phone,
-        "partner_email": customer_email,
-        "description": description
-    }
-    
-    # Configurar headers
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+    payload = _build_ticket_payload(customer_name, customer_phone, customer_email, subject, description)
     
     try:
         # Enviar la solicitud al webhook de Odoo
         logging.info(f"Enviando ticket a Odoo: {subject}")
-        response = requests.post(
-            odoo_webhook_url,
-            data=json.dumps(payload),
-            headers=headers,
+        response = _odoo_session.post(
+            ODOO_WEBHOOK_URL_TICKETS,
+            json=payload,
             timeout=15  # 15 segundos de timeout
         )
         
-        # Verificar si la solicitud fue exitosa
-        if response.status_code in [200, 201]:
-            logging.info(f"Ticket creado exitosamente en Odoo: {subject}")
-            return {
-                "success": True,
-                "message": "Ticket creado exitosamente",
-                "data": response.json() if response.text else {}
-            }
-        else:
-            logging.error(f"Error al crear ticket en Odoo. Status: {response.status_code}, Respuesta: {response.text}")
-            return {
-                "success": False,
-                "error": f"Error al crear ticket (código {response.status_code})",
-                "details": response.text
-            }
+        return _ticket_result(response, subject)
     
     except requests.Timeout:
         logging.error("Timeout al conectar con el webhook de Odoo")
@@ -87,4 +124,56 @@ def create_odoo_ticket(customer_name, customer_phone, customer_email, subject, d
         return {
             "success": False,
             "error": f"Error inesperado: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+
+async def create_odoo_ticket_async(customer_name, customer_phone, customer_email, subject, description):
+    """
+    Versión asíncrona de create_odoo_ticket que reutiliza un cliente httpx compartido.
+    
+    Args:
+        customer_name (str): Nombre del cliente
+        customer_phone (str): Número de teléfono del cliente
+        customer_email (str): Correo electrónico del cliente (puede estar vacío)
+        subject (str): Asunto o título del ticket
+        description (str): Descripción detallada del problema
+        
+    Returns:
+        dict: Respuesta del webhook de Odoo o mensaje de error
+    """
+    if ODOO_WEBHOOK_URL_TICKETS is None:
+        return {"error": "URL del webhook de Odoo no configurada"}
+    
+    payload = _build_ticket_payload(customer_name, customer_phone, customer_email, subject, description)
+    
+    try:
+        logging.info(f"Enviando ticket a Odoo: {subject}")
+        response = await _odoo_client.post(ODOO_WEBHOOK_URL_TICKETS, json=payload)
+        
+        return _ticket_result(response, subject)
+    
+    except httpx.TimeoutException:
+        logging.error("Timeout al conectar con el webhook de Odoo")
+        return {
+            "success": False,
+            "error": "Timeout al conectar con Odoo"
+        }
+    except httpx.HTTPError as e:
+        logging.error(f"Error de conexión con Odoo: {str(e)}")
+        return {
+            "success": False,
+            "error": f"Error de conexión: {str(e)}"
+        }
+    except Exception as e:
+        logging.error(f"Error inesperado al crear ticket: {str(e)}")
+        return {
+            "success": False,
+            "error": f"Error inesperado: {str(e)}"
+        }
+
+
+async def close_odoo_client():
+    """
+    Cierra el cliente HTTP asíncrono de Odoo. Debe llamarse al apagar la aplicación.
+    """
+    await _odoo_client.aclose()
@@ -1,17 +1,56 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
+import dbm
 import shelve
-from dotenv import load_dotenv
+import sqlite3
+import threading
 import os
-import time
+import asyncio
 import logging
-import json
-from app.services.odoo_integration import create_odoo_ticket
+import orjson
+from collections import OrderedDict
+from app.services.odoo_integration import create_odoo_ticket_async
 
-load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID")
 client = OpenAI(api_key=OPENAI_API_KEY)
 
+# Límite de conexiones simultáneas hacia OpenAI compartido por todas las corrutinas
+MAX_OPENAI_CONNECTIONS = 100
+aclient = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=MAX_OPENAI_CONNECTIONS)
+    ),
+)
+
+# Sondeo con backoff exponencial (segundos) cuando la API no envía la cabecera openai-poll-after-ms
+MIN_POLL_INTERVAL = 0.1
+MAX_POLL_INTERVAL = 2.0
+POLL_BACKOFF_FACTOR = 1.5
+
+# Función para enviar mensajes de WhatsApp fuera del contexto de Flask (user_id, message)
+send_message_func = None
+
+# Tickets que se están creando en segundo plano (referencias para que no se recolecten)
+_ticket_tasks = set()
+
+# wa_id -> [asyncio.Lock, corrutinas que lo usan]. Todas las corrutinas corren en el
+# mismo event loop, por lo que el diccionario no necesita un lock adicional
+_user_locks = {}
+
+
+def set_send_message_function(func):
+    """
+    Establece la función para enviar mensajes a WhatsApp, usada para confirmar
+    los tickets creados en segundo plano.
+    
+    Args:
+        func: Función que acepta user_id y message como parámetros
+    """
+    global send_message_func
+    send_message_func = func
+
 
 def upload_file(path):
     # Upload a file with an "assistants" purpose
@@ -34,35 +73,131 @@ def create_assistant(file):
     return assistant
 
 
-# Use context manager to ensure the shelf file is closed properly
+# Base de datos SQLite wa_id -> thread_id, abierta durante toda la vida del proceso.
+# El modo WAL permite seguir leyendo mientras se guarda un hilo nuevo
+_threads_db = sqlite3.connect("threads.db", check_same_thread=False, isolation_level=None)
+_threads_db.execute("PRAGMA journal_mode=WAL")
+_threads_db.execute(
+    "CREATE TABLE IF NOT EXISTS threads (wa_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL)"
+)
+_threads_db_lock = threading.Lock()
+
+
+def _import_legacy_threads(path="threads_db"):
+    """
+    Importa una única vez los hilos guardados por la versión anterior basada en shelve,
+    para que los usuarios existentes conserven su conversación.
+    """
+    if _threads_db.execute("SELECT 1 FROM threads LIMIT 1").fetchone():
+        return
+    try:
+        with shelve.open(path, flag="r") as legacy_shelf:
+            rows = list(legacy_shelf.items())
+    except dbm.error:
+        return
+    _threads_db.executemany(
+        "INSERT OR IGNORE INTO threads (wa_id, thread_id) VALUES (?, ?)", rows
+    )
+    logging.info(f"Importados {len(rows)} hilos desde {path}")
+
+
+_import_legacy_threads()
+
+# Un wa_id -> thread_id no cambia una vez guardado, así que las consultas recientes se
+# sirven desde una caché LRU acotada en memoria (protegida por _threads_db_lock) y no desde la base de datos
+THREAD_CACHE_SIZE = 50000
+_thread_cache = OrderedDict()
+
+
+def _cache_thread(wa_id, thread_id):
+    _thread_cache[wa_id] = thread_id
+    _thread_cache.move_to_end(wa_id)
+    if len(_thread_cache) > THREAD_CACHE_SIZE:
+        _thread_cache.popitem(last=False)
+
+
 def check_if_thread_exists(wa_id):
-    with shelve.open("threads_db") as threads_shelf:
-        return threads_shelf.get(wa_id, None)
+    with _threads_db_lock:
+        thread_id = _thread_cache.get(wa_id)
+        if thread_id is not None:
+            _thread_cache.move_to_end(wa_id)
+            return thread_id
+
+        row = _threads_db.execute(
+            "SELECT thread_id FROM threads WHERE wa_id = ?", (wa_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        _cache_thread(wa_id, row[0])
+        return row[0]
 
 
 def store_thread(wa_id, thread_id):
-    with shelve.open("threads_db", writeback=True) as threads_shelf:
-        threads_shelf[wa_id] = thread_id
+    with _threads_db_lock:
+        _threads_db.execute(
+            "INSERT OR REPLACE INTO threads (wa_id, thread_id) VALUES (?, ?)",
+            (wa_id, thread_id),
+        )
+        _cache_thread(wa_id, thread_id)
 
 
-def handle_function_call(thread_id, run_id, function_call, wa_id, name):
+async def retrieve_run(thread_id, run_id):
     """
-    Maneja las llamadas a funciones del asistente.
+    Obtiene el estado de una ejecución junto con el intervalo de sondeo sugerido por la API.
     
     Args:
         thread_id: ID del hilo de conversación
         run_id: ID de la ejecución
-        function_call: Objeto con la información de la llamada a función
+        
+    Returns:
+        tuple: (run, segundos sugeridos antes del siguiente sondeo o None si la API no los indica)
+    """
+    response = await aclient.beta.threads.runs.with_raw_response.retrieve(
+        thread_id=thread_id, run_id=run_id
+    )
+    poll_after_ms = response.headers.get("openai-poll-after-ms")
+    hinted_delay = int(poll_after_ms) / 1000 if poll_after_ms else None
+    return response.parse(), hinted_delay
+
+
+async def create_ticket_in_background(ticket_args, wa_id):
+    """
+    Crea el ticket en Odoo y notifica el resultado al usuario por WhatsApp.
+    
+    Args:
+        ticket_args (dict): Argumentos para create_odoo_ticket_async
+        wa_id: ID de WhatsApp del usuario
+    """
+    result = await create_odoo_ticket_async(**ticket_args)
+    
+    if result.get("success", False):
+        message = "¡Tu ticket de soporte ha sido creado! Un agente de soporte se pondrá en contacto contigo pronto."
+    else:
+        error_msg = result.get("error", "Error desconocido")
+        message = f"Lo siento, hubo un problema al crear tu ticket: {error_msg}. Por favor, inténtalo más tarde o contacta directamente con soporte."
+    
+    if send_message_func:
+        await asyncio.to_thread(send_message_func, wa_id, message)
+
+
+async def handle_function_call(tool_call, wa_id, name):
+    """
+    Maneja una llamada a función del asistente.
+    
+    Args:
+        tool_call: Objeto con la información de la llamada a herramienta
         wa_id: ID de WhatsApp del usuario
         name: Nombre del usuario
         
     Returns:
-        str: Respuesta después de procesar la función
+        dict: Salida de la herramienta lista para submit_tool_outputs
     """
+    function_call = tool_call.function
+    
     if function_call.name == "create_odoo_ticket":
         try:
             # Extraer los argumentos
-            args = json.loads(function_call.arguments)
+            args = orjson.loads(function_call.arguments)
             logging.info(f"Procesando creación de ticket para {name}: {args.get('subject', '')}")
             
             # Si no se proporciona customer_phone, usar el wa_id
@@ -73,59 +208,46 @@ def handle_function_call(thread_id, run_id, function_call, wa_id, name):
             if not args.get("customer_name"):
                 args["customer_name"] = name
             
-            # Llamar a la función de creación de ticket
-            result = create_odoo_ticket(
-                customer_name=args.get("customer_name", name),
-                customer_phone=args.get("customer_phone", wa_id),
-                customer_email=args.get("customer_email", ""),
-                subject=args.get("subject", ""),
-                description=args.get("description", "")
-            )
-            
-            # Enviar el resultado al asistente
-            client.beta.threads.runs.submit_tool_outputs(
-                thread_id=thread_id,
-                run_id=run_id,
-                tool_outputs=[
-                    {
-                        "tool_call_id": function_call.id,
-                        "output": json.dumps(result)
-                    }
-                ]
-            )
+            # Crear el ticket en segundo plano para no retrasar la respuesta del asistente;
+            # el usuario recibe la confirmación por WhatsApp cuando Odoo responde
+            ticket_args = {
+                "customer_name": args.get("customer_name", name),
+                "customer_phone": args.get("customer_phone", wa_id),
+                "customer_email": args.get("customer_email", ""),
+                "subject": args.get("subject", ""),
+                "description": args.get("description", "")
+            }
+            task = asyncio.create_task(create_ticket_in_background(ticket_args, wa_id))
+            _ticket_tasks.add(task)
+            task.add_done_callback(_ticket_tasks.discard)
             
-            # Esperar a que el asistente procese el resultado y devuelva una respuesta
-            return wait_for_run_completion(thread_id, run_id)
+            result = {
+                "status": "queued",
+                "message": "El ticket se está creando; el usuario recibirá la confirmación por WhatsApp"
+            }
             
         except Exception as e:
             logging.error(f"Error al procesar la creación del ticket: {str(e)}")
-            error_result = {
+            result = {
                 "success": False,
                 "error": f"Error al procesar la creación del ticket: {str(e)}"
             }
-            
-            # Enviar el error al asistente
-            client.beta.threads.runs.submit_tool_outputs(
-                thread_id=thread_id,
-                run_id=run_id,
-                tool_outputs=[
-                    {
-                        "tool_call_id": function_call.id,
-                        "output": json.dumps(error_result)
-                    }
-                ]
-            )
-            
-            # Esperar la respuesta actualizada
-            return wait_for_run_completion(thread_id, run_id)
     
     # Para otras funciones que puedan añadirse en el futuro
     else:
         logging.warning(f"Llamada a función no soportada: {function_call.name}")
-        return "Lo siento, no puedo procesar esa solicitud en este momento."
+        result = {
+            "success": False,
+            "error": f"Función no soportada: {function_call.name}"
+        }
+    
+    return {
+        "tool_call_id": tool_call.id,
+        "output": orjson.dumps(result).decode()
+    }
 
 
-def wait_for_run_completion(thread_id, run_id):
+async def wait_for_run_completion(thread_id, run_id):
     """
     Espera a que se complete la ejecución y devuelve el mensaje más reciente.
     
@@ -137,13 +259,13 @@ def wait_for_run_completion(thread_id, run_id):
         str: Contenido del mensaje más reciente
     """
     # Esperar a que se complete la ejecución
+    delay = MIN_POLL_INTERVAL
     while True:
-        time.sleep(0.5)
-        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+        run, hinted_delay = await retrieve_run(thread_id, run_id)
         
         if run.status == "completed":
             # Obtener mensajes y devolver el más reciente
-            messages = client.beta.threads.messages.list(thread_id=thread_id)
+            messages = await aclient.beta.threads.messages.list(thread_id=thread_id)
             if messages.data:
                 return messages.data[0].content[0].text.value
         
@@ -155,9 +277,87 @@ def wait_for_run_completion(thread_id, run_id):
         elif run.status in ["failed", "cancelled", "expired"]:
             logging.error(f"La ejecución falló con estado: {run.status}")
             return "Lo siento, ha ocurrido un error al procesar tu solicitud."
+        
+        # Respetar el intervalo sugerido por la API; si no hay, aumentar la espera gradualmente
+        if hinted_delay is not None:
+            await asyncio.sleep(hinted_delay)
+        else:
+            await asyncio.sleep(delay)
+            delay = min(delay * POLL_BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+
+
+async def process_run_stream(stream_manager, thread_id, run_id, name, wa_id):
+    """
+    Consume los eventos de una ejecución en streaming y devuelve la respuesta final.
+    
+    Reacciona en cuanto llega cada evento (requires_action, completed, failed)
+    en lugar de sondear el estado de la ejecución.
+    
+    Args:
+        stream_manager: Stream devuelto por runs.stream o runs.submit_tool_outputs_stream
+        thread_id: ID del hilo de conversación
+        run_id: ID de la ejecución (None si aún no se conoce)
+        name: Nombre del usuario
+        wa_id: ID de WhatsApp del usuario
+        
+    Returns:
+        str: Respuesta del asistente
+    """
+    new_message = None
+    async with stream_manager as stream:
+        async for event in stream:
+            if event.event == "thread.run.created":
+                run_id = event.data.id
+            
+            # Guardar el último mensaje completado del asistente
+            elif event.event == "thread.message.completed":
+                new_message = event.data.content[0].text.value
+            
+            # Si la ejecución requiere acciones (llamadas a funciones)
+            elif event.event == "thread.run.requires_action":
+                run = event.data
+                tool_calls = [
+                    tool_call
+                    for tool_call in run.required_action.submit_tool_outputs.tool_calls
+                    if tool_call.type == "function"
+                ]
+                logging.info(
+                    f"Llamadas a funciones detectadas: {[tc.function.name for tc in tool_calls]}"
+                )
+                
+                # Ejecutar todas las llamadas en paralelo y enviar sus salidas juntas
+                tool_outputs = await asyncio.gather(
+                    *(handle_function_call(tool_call, wa_id, name) for tool_call in tool_calls)
+                )
+                tool_stream = aclient.beta.threads.runs.submit_tool_outputs_stream(
+                    thread_id=thread_id,
+                    run_id=run.id,
+                    tool_outputs=list(tool_outputs),
+                )
+                
+                # Esperar a que el asistente procese los resultados y devuelva una respuesta
+                return await process_run_stream(tool_stream, thread_id, run.id, name, wa_id)
+            
+            elif event.event == "thread.run.completed":
+                if new_message is not None:
+                    return new_message
+                messages = await aclient.beta.threads.messages.list(thread_id=thread_id)
+                return messages.data[0].content[0].text.value
+            
+            # Si falla la ejecución
+            elif event.event in ["thread.run.failed", "thread.run.cancelled", "thread.run.expired"]:
+                logging.error(f"La ejecución falló con estado: {event.data.status}")
+                return "Lo siento, ha ocurrido un error al procesar tu solicitud."
+    
+    # El stream terminó sin un evento final: consultar el estado por sondeo
+    if run_id is None:
+        logging.error("El stream de la ejecución terminó sin identificador de ejecución")
+        return "Lo siento, ha ocurrido un error al procesar tu solicitud."
+    logging.warning(f"El stream de la ejecución {run_id} terminó sin evento final")
+    return await wait_for_run_completion(thread_id, run_id)
 
 
-def run_assistant(thread, name, wa_id):
+async def run_assistant(thread, name, wa_id):
     """
     Ejecuta el asistente y maneja posibles llamadas a funciones.
     
@@ -169,73 +369,70 @@ def run_assistant(thread, name, wa_id):
     Returns:
         str: Respuesta del asistente
     """
-    # Retrieve the Assistant
-    assistant = client.beta.assistants.retrieve(OPENAI_ASSISTANT_ID)
-
-    # Run the assistant
-    run = client.beta.threads.runs.create(
+    # Ejecutar el asistente (solo se necesita su id, así que no hace falta recuperarlo antes)
+    stream = aclient.beta.threads.runs.stream(
         thread_id=thread.id,
-        assistant_id=assistant.id,
+        assistant_id=OPENAI_ASSISTANT_ID,
         # instructions=f"You are having a conversation with {name}",
     )
-
-    # Poll for completion or required actions
-    while True:
-        time.sleep(0.5)
-        run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-        
-        # Si la ejecución requiere acciones (llamadas a funciones)
-        if run.status == "requires_action":
-            # Procesar la llamada a la función
-            tool_calls = run.required_action.submit_tool_outputs.tool_calls
-            
-            # Procesar cada llamada a función (generalmente será solo una)
-            for tool_call in tool_calls:
-                if tool_call.type == "function":
-                    function_call = tool_call.function
-                    logging.info(f"Llamada a función detectada: {function_call.name}")
-                    return handle_function_call(thread.id, run.id, function_call, wa_id, name)
-        
-        # Si se completa sin llamadas a funciones
-        elif run.status == "completed":
-            break
-        
-        # Si falla la ejecución
-        elif run.status in ["failed", "cancelled", "expired"]:
-            logging.error(f"La ejecución falló con estado: {run.status}")
-            return "Lo siento, ha ocurrido un error al procesar tu solicitud."
-
-    # Retrieve the Messages
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
-    new_message = messages.data[0].content[0].text.value
+    new_message = await process_run_stream(stream, thread.id, None, name, wa_id)
     logging.info(f"Generated message: {new_message}")
     return new_message
 
 
-def generate_response(message_body, wa_id, name):
+async def generate_response(message_body, wa_id, name):
+    """
+    Genera la respuesta del asistente para un mensaje del usuario.
+    
+    Los mensajes de un mismo usuario se procesan de uno en uno: OpenAI no permite
+    dos ejecuciones simultáneas sobre el mismo hilo, así que el segundo mensaje
+    espera a que termine la ejecución del primero.
+    
+    Args:
+        message_body (str): Texto del mensaje
+        wa_id: ID de WhatsApp del usuario
+        name: Nombre del usuario
+        
+    Returns:
+        str: Respuesta del asistente
+    """
+    entry = _user_locks.setdefault(wa_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            return await _generate_response(message_body, wa_id, name)
+    finally:
+        # Eliminar el lock cuando ya nadie lo usa para que el diccionario no crezca sin límite
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _user_locks[wa_id]
+
+
+async def _generate_response(message_body, wa_id, name):
     # Check if there is already a thread_id for the wa_id
     thread_id = check_if_thread_exists(wa_id)
 
     # If a thread doesn't exist, create one and store it
     if thread_id is None:
         logging.info(f"Creating new thread for {name} with wa_id {wa_id}")
-        thread = client.beta.threads.create()
+        thread = await aclient.beta.threads.create()
         store_thread(wa_id, thread.id)
         thread_id = thread.id
 
     # Otherwise, retrieve the existing thread
     else:
         logging.info(f"Retrieving existing thread for {name} with wa_id {wa_id}")
-        thread = client.beta.threads.retrieve(thread_id)
+        thread = await aclient.beta.threads.retrieve(thread_id)
 
     # Add message to thread
-    message = client.beta.threads.messages.create(
+    message = await aclient.beta.threads.messages.create(
         thread_id=thread_id,
         role="user",
         content=message_body,
     )
 
     # Run the assistant and get the new message
-    new_message = run_assistant(thread, name, wa_id)
+    new_message = await run_assistant(thread, name, wa_id)
+
+    return new_message
 
-    return new_message
\ No newline at end of file
@@ -1,7 +1,118 @@
+import os
 import time
+import logging
+import heapq
 import threading
-import json
-from datetime import datetime, timedelta
+import types
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from collections import deque
+
+# Número de fragmentos por defecto en que se reparten las sesiones, cada uno con su propio lock.
+# Las lecturas que no modifican la sesión no toman el lock: en CPython las consultas y
+# asignaciones sobre un dict son atómicas, así que como mucho leen un valor recién cambiado
+SESSION_SHARDS = 32
+
+# Número máximo de mensajes que se conservan por defecto en el historial de cada sesión.
+# get_message_history solo devuelve los más recientes, y cada guardado serializa el
+# historial completo, así que conservar más mensajes solo encarece los guardados
+MAX_HISTORY = 50
+
+# Límites de espera del hilo de limpieza entre revisiones, en segundos. El mínimo agrupa en
+# una sola pasada los vencimientos cercanos; el máximo es una revisión de respaldo aunque
+# no haya nada programado
+MIN_CLEANUP_WAIT = 1
+MAX_CLEANUP_WAIT = 300
+
+# Intervalo mínimo, en segundos, entre dos actualizaciones de last_activity de una misma
+# sesión: los mensajes seguidos de un usuario no vuelven a marcarla como modificada
+LAST_ACTIVITY_TTU = 30
+
+# Hilos que envían en paralelo las advertencias y cierres por inactividad
+NOTIFY_WORKERS = 16
+
+# Mensajes de notificación enviados por el hilo de limpieza
+_INACTIVITY_WARNING_MSG = "¿Sigues ahí? Esta conversación se cerrará por inactividad en 5 minutos. Si ya no necesitas asistencia, puedes responder 'finalizar' para cerrar la conversación."
+_SESSION_CLOSED_MSG = "La conversación ha sido finalizada debido a inactividad. Puedes iniciar una nueva conversación cuando lo necesites."
+
+
+def _monotonic_to_wall(value):
+    """
+    Convierte un instante de time.monotonic() al timestamp equivalente de time.time().
+    """
+    return time.time() - (time.monotonic() - value)
+
+
+def _wall_to_monotonic(value):
+    """
+    Convierte un timestamp de time.time() al instante equivalente de time.monotonic().
+    """
+    return time.monotonic() - (time.time() - value)
+
+
+# Contexto inicial compartido por todas las sesiones nuevas. Es de solo lectura: quien
+# necesite guardar datos asigna un dict propio a la sesión (copia al escribir)
+EMPTY_CONTEXT = types.MappingProxyType({})
+
+
+def _snapshot_session(session):
+    """
+    Copia superficial de una sesión, como dict, para serializarla fuera del lock de su fragmento.
+    """
+    snapshot = {field: getattr(session, field) for field in Session.__slots__}
+    history = session.message_history
+    snapshot['context'] = dict(session.context)
+    snapshot['message_history'] = list(history) if history is not None else None
+    return snapshot
+
+
+def _serialize_session(snapshot):
+    """
+    Convierte el instante monotónico de una copia de sesión a timestamp y la serializa con orjson.
+    """
+    snapshot['last_activity'] = _monotonic_to_wall(snapshot['last_activity'])
+    return orjson.dumps(snapshot)
+
+
+def _history_entry(role, content):
+    """
+    Construye una entrada del historial de mensajes.
+    """
+    return {
+        'role': role,
+        'content': content,
+        'timestamp': time.time()
+    }
+
+
+class Session:
+    """
+    Estado de la conversación con un usuario. Con __slots__ cada sesión ocupa bastante
+    menos memoria que un dict con las mismas claves.
+    """
+    
+    __slots__ = (
+        'created_at',               # Timestamp de time.time()
+        'last_activity',            # Instante de time.monotonic()
+        'state',
+        'context',                  # dict, o EMPTY_CONTEXT hasta guardar el primer dato
+        'thread_id',                # Para OpenAI Assistants API
+        'message_history',          # deque, o None hasta el primer mensaje
+        'inactivity_warning_sent',
+        'closing_notice_sent',
+    )
+    
+    def __init__(self, created_at, last_activity, state='INITIAL', context=EMPTY_CONTEXT, thread_id=None,
+                 message_history=None, inactivity_warning_sent=False, closing_notice_sent=False):
+        self.created_at = created_at
+        self.last_activity = last_activity
+        self.state = state
+        self.context = context
+        self.thread_id = thread_id
+        self.message_history = message_history
+        self.inactivity_warning_sent = inactivity_warning_sent
+        self.closing_notice_sent = closing_notice_sent
 
 
 class SessionManager:
@@ -10,21 +121,64 @@ class SessionManager:
     Mantiene el estado de las conversaciones con los usuarios y maneja la expiración de sesiones.
     """
     
-    def __init__(self, session_timeout=600):  # 10 minutos por defecto
+    # Campos que update_session puede modificar; los timestamps los gestiona el propio gestor
+    _UPDATABLE_FIELDS = frozenset({
+        'state', 'context', 'thread_id', 'message_history',
+        'inactivity_warning_sent', 'closing_notice_sent'
+    })
+    
+    def __init__(self, session_timeout=600, max_history=MAX_HISTORY, shards=SESSION_SHARDS, activity_ttu=None):  # 10 minutos por defecto
         """
         Inicializa el gestor de sesiones.
         
         Args:
             session_timeout (int): Tiempo en segundos antes de que una sesión expire por inactividad
+            max_history (int): Número máximo de mensajes conservados en el historial de cada sesión
+            shards (int): Número de fragmentos (cada uno con su lock) en que se reparten las sesiones
+            activity_ttu (float): Segundos mínimos entre actualizaciones de last_activity
+                (por defecto LAST_ACTIVITY_TTU, sin superar una décima parte del aviso de inactividad)
         """
-        self.sessions = {}
+        # En cada sesión 'last_activity' es un instante de time.monotonic() (solo se usa
+        # para medir inactividad) y 'created_at' un timestamp de time.time(), igual que
+        # el de cada mensaje del historial; en disco todos se guardan como timestamps
         self.session_timeout = session_timeout
         self.inactivity_warning = session_timeout // 2  # Advertencia a la mitad del timeout (5 min)
-        self.lock = threading.RLock()  # Para operaciones thread-safe
+        self.max_history = max_history
+        if activity_ttu is None:
+            activity_ttu = min(LAST_ACTIVITY_TTU, self.inactivity_warning / 10)
+        self.activity_ttu = activity_ttu
+        
+        # Sesiones repartidas en fragmentos por user_id: usuarios distintos no compiten por el mismo lock
+        self._shard_count = shards
+        self._shards = [{} for _ in range(shards)]
+        self._shard_locks = [threading.RLock() for _ in range(shards)]
+        
+        # Montículo de revisiones pendientes (timestamp, user_id), con a lo sumo una entrada
+        # por usuario (los que ya tienen una están en _scheduled_users). Si al revisar una
+        # sesión hubo actividad posterior, la revisión se reprograma en ese momento.
+        # Orden de locks: primero el del fragmento y después _heap_lock, nunca al revés
+        self._expiry_heap = []
+        self._scheduled_users = set()
+        self._heap_lock = threading.Lock()
+        self._wake = threading.Event()
+        
+        # Conexiones SQLite abiertas por ruta; _save_lock serializa su uso entre
+        # el hilo de guardado automático y los guardados o cargas explícitos
+        self._dbs = {}
+        self._save_lock = threading.Lock()
+        
+        # Usuarios cuya sesión cambió desde el último guardado, para escribir solo esas filas.
+        # Orden de locks: primero el del fragmento y después _dirty_lock
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
         
         # Función para enviar mensajes
         self.send_message_func = None
         
+        # Las notificaciones se envían desde un pool para que el hilo de limpieza no
+        # espere a la red por cada usuario cuando vencen muchas sesiones a la vez
+        self._notify_pool = ThreadPoolExecutor(max_workers=NOTIFY_WORKERS, thread_name_prefix="session-notify")
+        
         # Iniciar thread de limpieza en segundo plano
         self.cleanup_thread = threading.Thread(target=self._cleanup_expired_sessions, daemon=True)
         self.cleanup_thread.start()
@@ -38,6 +192,103 @@ class SessionManager:
         """
         self.send_message_func = func
     
+    def start_autosave(self, filepath, interval=30):
+        """
+        Inicia un hilo en segundo plano que guarda las sesiones periódicamente,
+        para no reescribir el archivo completo tras cada mensaje.
+        
+        Args:
+            filepath (str): Ruta de la base de datos SQLite donde guardar las sesiones
+            interval (int): Segundos entre guardados
+        """
+        def autosave():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush_dirty_sessions(filepath)
+                except Exception as e:
+                    logging.error(f"Error al guardar las sesiones: {str(e)}")
+        
+        self.autosave_thread = threading.Thread(target=autosave, daemon=True)
+        self.autosave_thread.start()
+    
+    def _append_history(self, session, role, content):
+        """
+        Agrega una entrada al historial de una sesión, creando el deque si aún no existe.
+        Debe llamarse con el lock del fragmento de la sesión adquirido.
+        
+        Args:
+            session (Session): Sesión del usuario
+            role (str): Rol del mensaje ('user' o 'assistant')
+            content (str): Contenido del mensaje
+        """
+        history = session.message_history
+        if history is None:
+            history = session.message_history = deque(maxlen=self.max_history)
+        history.append(_history_entry(role, content))
+    
+    def _touch(self, user_id, session):
+        """
+        Registra actividad en una sesión: actualiza last_activity, resetea los indicadores
+        de advertencia y programa la siguiente revisión. Si la última actualización fue hace
+        menos de activity_ttu segundos no hace nada, para no marcar la sesión como modificada
+        con cada mensaje. Debe llamarse con el lock del fragmento adquirido.
+        
+        Args:
+            user_id (str): ID de WhatsApp del usuario
+            session (Session): Sesión del usuario
+        """
+        now = time.monotonic()
+        if now - session.last_activity < self.activity_ttu:
+            return
+        
+        session.last_activity = now
+        session.inactivity_warning_sent = False
+        session.closing_notice_sent = False
+        
+        self._mark_dirty(user_id)
+        self._schedule_check(user_id, now + self.inactivity_warning)
+    
+    def _shard(self, user_id):
+        """
+        Devuelve el lock y el diccionario del fragmento donde vive la sesión de un usuario.
+        
+        Args:
+            user_id (str): ID de WhatsApp del usuario
+            
+        Returns:
+            tuple: (lock, diccionario de sesiones del fragmento)
+        """
+        index = hash(user_id) % self._shard_count
+        return self._shard_locks[index], self._shards[index]
+    
+    def _mark_dirty(self, user_id):
+        """
+        Marca la sesión de un usuario como pendiente de guardar.
+        
+        Args:
+            user_id (str): ID de WhatsApp del usuario
+        """
+        with self._dirty_lock:
+            self._dirty.add(user_id)
+    
+    def _schedule_check(self, user_id, deadline):
+        """
+        Programa una revisión de inactividad para un usuario, salvo que ya tenga una pendiente.
+        
+        Args:
+            user_id (str): ID de WhatsApp del usuario
+            deadline (float): Timestamp en el que debe revisarse la sesión
+        """
+        with self._heap_lock:
+            if user_id in self._scheduled_users:
+                return
+            self._scheduled_users.add(user_id)
+            heapq.heappush(self._expiry_heap, (deadline, user_id))
+            # Despertar al hilo de limpieza si esta revisión es ahora la más próxima
+            if self._expiry_heap[0] == (deadline, user_id):
+                self._wake.set()
+    
     def get_session(self, user_id):
         """
         Obtiene la sesión de un usuario. Si no existe, crea una nueva.
@@ -46,30 +297,21 @@ class SessionManager:
             user_id (str): ID de WhatsApp del usuario
             
         Returns:
-            dict: Objeto de sesión del usuario
+            Session: Objeto de sesión del usuario
         """
-        with self.lock:
-            if user_id not in self.sessions:
+        lock, sessions = self._shard(user_id)
+        with lock:
+            session = sessions.get(user_id)
+            if session is None:
                 # Crear nueva sesión
-                self.sessions[user_id] = {
-                    'created_at': datetime.now(),
-                    'last_activity': datetime.now(),
-                    'state': 'INITIAL',
-                    'context': {},
-                    'thread_id': None,  # Para OpenAI Assistants API
-                    'message_history': [],
-                    'inactivity_warning_sent': False,
-                    'closing_notice_sent': False
-                }
+                now = time.monotonic()
+                session = sessions[user_id] = Session(created_at=time.time(), last_activity=now)
+                self._mark_dirty(user_id)
+                self._schedule_check(user_id, now + self.inactivity_warning)
             else:
-                # Actualizar timestamp de última actividad
-                self.sessions[user_id]['last_activity'] = datetime.now()
-                
-                # Resetear los indicadores de advertencia cuando hay actividad
-                self.sessions[user_id]['inactivity_warning_sent'] = False
-                self.sessions[user_id]['closing_notice_sent'] = False
-            
-            return self.sessions[user_id]
+                # Registrar la actividad y resetear los indicadores de advertencia
+                self._touch(user_id, session)
+            return session
     
     def update_session(self, user_id, **kwargs):
         """
@@ -79,19 +321,23 @@ class SessionManager:
             user_id (str): ID de WhatsApp del usuario
             **kwargs: Pares clave-valor para actualizar la sesión
         """
-        with self.lock:
-            if user_id in self.sessions:
-                session = self.sessions[user_id]
+        lock, sessions = self._shard(user_id)
+        with lock:
+            if user_id in sessions:
+                session = sessions[user_id]
                 for key, value in kwargs.items():
-                    if key in session:
-                        session[key] = value
-                
-                # Actualizar timestamp de última actividad
-                session['last_activity'] = datetime.now()
+                    if key in self._UPDATABLE_FIELDS:
+                        if key == 'context' and not value:
+                            # Un contexto vacío vuelve al compartido en lugar de ocupar un dict propio
+                            value = EMPTY_CONTEXT
+                        elif key == 'message_history' and value is not None:
+                            # Conservar el límite del historial y el deque del que dependen los append sin lock
+                            value = deque(value, maxlen=self.max_history) if value else None
+                        setattr(session, key, value)
+                self._mark_dirty(user_id)
                 
-                # Resetear los indicadores de advertencia
-                session['inactivity_warning_sent'] = False
-                session['closing_notice_sent'] = False
+                # Registrar la actividad y resetear los indicadores de advertencia
+                self._touch(user_id, session)
     
     def end_session(self, user_id):
         """
@@ -100,9 +346,14 @@ class SessionManager:
         Args:
             user_id (str): ID de WhatsApp del usuario
         """
-        with self.lock:
-            if user_id in self.sessions:
-                del self.sessions[user_id]
+        lock, sessions = self._shard(user_id)
+        # Comprobación sin lock: si la sesión no existe no hay nada que finalizar
+        if user_id not in sessions:
+            return
+        with lock:
+            if user_id in sessions:
+                del sessions[user_id]
+                self._mark_dirty(user_id)
     
     def is_session_active(self, user_id):
         """
@@ -114,94 +365,163 @@ class SessionManager:
         Returns:
             bool: True si la sesión está activa, False en caso contrario
         """
-        with self.lock:
-            if user_id not in self.sessions:
-                return False
-            
-            session = self.sessions[user_id]
-            expiration_time = session['last_activity'] + timedelta(seconds=self.session_timeout)
-            return datetime.now() < expiration_time
+        _, sessions = self._shard(user_id)
+        session = sessions.get(user_id)
+        if session is None:
+            return False
+        return time.monotonic() - session.last_activity < self.session_timeout
     
     def _cleanup_expired_sessions(self):
         """
-        Thread en segundo plano que limpia periódicamente las sesiones expiradas
-        y envía notificaciones de inactividad.
+        Thread en segundo plano que cierra las sesiones expiradas y envía notificaciones
+        de inactividad. Duerme hasta la próxima revisión programada en el montículo,
+        por lo que solo procesa las sesiones que realmente han vencido.
+        
+        La limpieza no se delega al tráfico entrante (por ejemplo, con una probabilidad
+        en cada get_session): las advertencias y cierres deben enviarse a su hora aunque
+        nadie escriba, y hacerlo en el hilo del webhook añadiría envíos a la Graph API
+        a la latencia de un usuario ajeno.
         """
         while True:
-            time.sleep(30)  # Verificar cada 30 segundos
+            with self._heap_lock:
+                timeout = self._expiry_heap[0][0] - time.monotonic() if self._expiry_heap else MAX_CLEANUP_WAIT
+            
+            # Esperar hasta la próxima revisión o hasta que se programe una más cercana
+            if timeout > 0:
+                self._wake.wait(min(MAX_CLEANUP_WAIT, max(MIN_CLEANUP_WAIT, timeout)))
+                self._wake.clear()
             
             users_to_warn = []
             users_to_close = []
             
-            # Recopilar usuarios que necesitan atención
-            with self.lock:
-                current_time = datetime.now()
-                
-                for user_id, session in list(self.sessions.items()):
-                    inactive_time = (current_time - session['last_activity']).total_seconds()
+            # Extraer del montículo las revisiones vencidas
+            now = time.monotonic()
+            due_users = []
+            with self._heap_lock:
+                while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                    user_id = heapq.heappop(self._expiry_heap)[1]
+                    self._scheduled_users.discard(user_id)
+                    due_users.append(user_id)
+            
+            # Recopilar usuarios que necesitan atención, bloqueando solo su fragmento
+            for user_id in due_users:
+                lock, sessions = self._shard(user_id)
+                with lock:
+                    session = sessions.get(user_id)
+                    
+                    # La sesión ya fue finalizada
+                    if session is None:
+                        continue
+                    
+                    last_activity = session.last_activity
                     
                     # Usuarios para cerrar sesión
-                    if inactive_time >= self.session_timeout and not session['closing_notice_sent']:
+                    if now >= last_activity + self.session_timeout and not session.closing_notice_sent:
                         users_to_close.append(user_id)
-                        session['closing_notice_sent'] = True
+                        session.closing_notice_sent = True
+                        self._mark_dirty(user_id)
                     
-                    # Usuarios para advertir
-                    elif inactive_time >= self.inactivity_warning and not session['inactivity_warning_sent']:
+                    # Usuarios para advertir; se programa la revisión de cierre
+                    elif now >= last_activity + self.inactivity_warning and not session.inactivity_warning_sent:
                         users_to_warn.append(user_id)
-                        session['inactivity_warning_sent'] = True
+                        session.inactivity_warning_sent = True
+                        self._mark_dirty(user_id)
+                        self._schedule_check(user_id, last_activity + self.session_timeout)
+                    
+                    # Hubo actividad posterior: reprogramar según la última actividad
+                    elif not session.closing_notice_sent:
+                        if session.inactivity_warning_sent:
+                            self._schedule_check(user_id, last_activity + self.session_timeout)
+                        else:
+                            self._schedule_check(user_id, last_activity + self.inactivity_warning)
             
-            # Procesar advertencias fuera del lock
+            # Procesar advertencias y cierres fuera del lock, en paralelo. Los indicadores
+            # marcados arriba garantizan que cada usuario se notifique una sola vez
             for user_id in users_to_warn:
-                self._send_inactivity_warning(user_id)
+                self._notify_pool.submit(self._send_inactivity_warning, user_id)
             
-            # Procesar cierres fuera del lock
             for user_id in users_to_close:
-                self._close_inactive_session(user_id)
+                self._notify_pool.submit(self._close_inactive_session, user_id)
     
     def _send_inactivity_warning(self, user_id):
         """
         Envía un mensaje de advertencia de inactividad.
         """
         try:
-            warning_message = "¿Sigues ahí? Esta conversación se cerrará por inactividad en 5 minutos. Si ya no necesitas asistencia, puedes responder 'finalizar' para cerrar la conversación."
-            
             if self.send_message_func:
-                self.send_message_func(user_id, warning_message)
+                self.send_message_func(user_id, _INACTIVITY_WARNING_MSG)
             
-            # Registrar mensaje en el historial (sin actualizar last_activity)
-            with self.lock:
-                if user_id in self.sessions:
-                    self.sessions[user_id]['message_history'].append({
-                        'role': 'assistant',
-                        'content': warning_message,
-                        'timestamp': datetime.now().isoformat()
-                    })
+            # Registrar mensaje en el historial (sin actualizar last_activity). Si el historial
+            # ya existe no hace falta el lock del fragmento: deque.append es atómico, y si la
+            # sesión se elimina entre la consulta y el append, el mensaje se descarta con ella
+            lock, sessions = self._shard(user_id)
+            session = sessions.get(user_id)
+            if session is not None:
+                history = session.message_history
+                if history is not None:
+                    history.append(_history_entry('assistant', _INACTIVITY_WARNING_MSG))
+                else:
+                    with lock:
+                        self._append_history(session, 'assistant', _INACTIVITY_WARNING_MSG)
+                self._mark_dirty(user_id)
         except Exception as e:
-            print(f"Error al enviar advertencia de inactividad: {str(e)}")
+            logging.error(f"Error al enviar advertencia de inactividad: {str(e)}")
+    
+    def _expired_for_closing(self, user_id, sessions):
+        """
+        Comprueba que una sesión marcada para cierre sigue vencida. Si el usuario volvió a
+        escribir, reprograma su siguiente revisión según la última actividad.
+        Debe llamarse con el lock del fragmento de la sesión adquirido.
+        
+        Args:
+            user_id (str): ID de WhatsApp del usuario
+            sessions (dict): Diccionario de sesiones del fragmento
+            
+        Returns:
+            bool: True si la sesión todavía debe cerrarse
+        """
+        session = sessions.get(user_id)
+        if session is None:
+            return False
+        
+        last_activity = session.last_activity
+        if session.closing_notice_sent and time.monotonic() - last_activity >= self.session_timeout:
+            return True
+        
+        if session.inactivity_warning_sent:
+            self._schedule_check(user_id, last_activity + self.session_timeout)
+        else:
+            self._schedule_check(user_id, last_activity + self.inactivity_warning)
+        return False
     
     def _close_inactive_session(self, user_id):
         """
         Cierra una sesión inactiva y envía mensaje de notificación.
         """
         try:
-            closing_message = "La conversación ha sido finalizada debido a inactividad. Puedes iniciar una nueva conversación cuando lo necesites."
+            # No enviar el aviso de cierre si el usuario volvió a escribir
+            lock, sessions = self._shard(user_id)
+            with lock:
+                if not self._expired_for_closing(user_id, sessions):
+                    return
             
             if self.send_message_func:
-                self.send_message_func(user_id, closing_message)
+                self.send_message_func(user_id, _SESSION_CLOSED_MSG)
             
-            # Registrar mensaje en el historial antes de eliminar la sesión
-            with self.lock:
-                if user_id in self.sessions:
-                    self.sessions[user_id]['message_history'].append({
-                        'role': 'assistant',
-                        'content': closing_message,
-                        'timestamp': datetime.now().isoformat()
-                    })
-                    
-                    # Eliminar la sesión después de enviar el mensaje
-                    del self.sessions[user_id]
+            # El cierre corre en el pool algo después de que el hilo de limpieza lo decidiera:
+            # si el usuario escribió mientras tanto, conservar la sesión en lugar de borrarla
+            with lock:
+                if not self._expired_for_closing(user_id, sessions):
+                    return
+                
+                # Registrar mensaje en el historial antes de eliminar la sesión
+                self._append_history(sessions[user_id], 'assistant', _SESSION_CLOSED_MSG)
+                
+                # Eliminar la sesión después de enviar el mensaje
+                del sessions[user_id]
+                self._mark_dirty(user_id)
         except Exception as e:
-            print(f"Error al cerrar sesión inactiva: {str(e)}")
+            logging.error(f"Error al cerrar sesión inactiva: {str(e)}")
     
     def add_message_to_history(self, user_id, role, content):
         """
@@ -212,18 +532,15 @@ class SessionManager:
             role (str): Rol del mensaje ('user' o 'assistant')
             content (str): Contenido del mensaje
         """
-        with self.lock:
-            if user_id in self.sessions:
-                self.sessions[user_id]['message_history'].append({
-                    'role': role,
-                    'content': content,
-                    'timestamp': datetime.now().isoformat()
-                })
-                self.sessions[user_id]['last_activity'] = datetime.now()
+        lock, sessions = self._shard(user_id)
+        with lock:
+            if user_id in sessions:
+                session = sessions[user_id]
+                self._append_history(session, role, content)
+                self._mark_dirty(user_id)
                 
-                # Resetear los indicadores de advertencia
-                self.sessions[user_id]['inactivity_warning_sent'] = False
-                self.sessions[user_id]['closing_notice_sent'] = False
+                # Registrar la actividad y resetear los indicadores de advertencia
+                self._touch(user_id, session)
     
     def get_message_history(self, user_id, limit=10):
         """
@@ -236,55 +553,196 @@ class SessionManager:
         Returns:
             list: Lista de mensajes recientes
         """
-        with self.lock:
-            if user_id in self.sessions:
-                # Devolver los últimos 'limit' mensajes
-                return self.sessions[user_id]['message_history'][-limit:]
+        _, sessions = self._shard(user_id)
+        session = sessions.get(user_id)
+        if session is None:
+            return []
+        
+        history = session.message_history
+        if history is None:
             return []
+        
+        # Sin lock: list() copia el deque en una sola llamada en C que no puede
+        # intercalarse con un append de otro hilo. La copia es privada del llamador,
+        # así que puede devolverse tal cual si ya cabe en el límite
+        messages = list(history)
+        
+        # Devolver los últimos 'limit' mensajes; como con messages[-limit:], un límite
+        # de 0 devuelve el historial completo
+        if limit == 0 or len(messages) <= limit:
+            return messages
+        return messages[-limit:]
+    
+    def _db(self, filepath):
+        """
+        Devuelve la conexión SQLite (modo WAL) de una ruta, creándola junto con la tabla
+        la primera vez. Debe llamarse con _save_lock adquirido.
+        
+        Args:
+            filepath (str): Ruta de la base de datos SQLite
+            
+        Returns:
+            sqlite3.Connection: Conexión a la base de datos
+        """
+        db = self._dbs.get(filepath)
+        if db is None:
+            db = sqlite3.connect(filepath, check_same_thread=False)
+            try:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS sessions ("
+                    "user_id TEXT PRIMARY KEY, data BLOB NOT NULL, last_activity REAL NOT NULL)"
+                )
+                db.commit()
+            except sqlite3.Error:
+                # La ruta no es una base de datos válida: no dejar la conexión abierta
+                db.close()
+                raise
+            self._dbs[filepath] = db
+        return db
     
     def save_sessions(self, filepath):
         """
-        Guarda todas las sesiones activas en un archivo JSON.
+        Guarda todas las sesiones activas en una base de datos SQLite, reemplazando
+        las que hubiera.
+        
+        Args:
+            filepath (str): Ruta de la base de datos SQLite donde guardar las sesiones
+        """
+        with self._save_lock:
+            # Todas las sesiones se escriben de nuevo: las marcas pendientes dejan de ser necesarias
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+            
+            def rows():
+                # Bajo el lock de cada fragmento solo se copian sus sesiones (copia superficial);
+                # se serializan fuera del lock y se entregan a SQLite a medida que se generan,
+                # de modo que nunca hay en memoria una lista con todas las sesiones
+                for lock, sessions in zip(self._shard_locks, self._shards):
+                    with lock:
+                        snapshot = [(user_id, _snapshot_session(session)) for user_id, session in sessions.items()]
+                    for user_id, session in snapshot:
+                        data = _serialize_session(session)
+                        yield user_id, data, session['last_activity']
+            
+            try:
+                db = self._db(filepath)
+                with db:
+                    db.execute("DELETE FROM sessions")
+                    db.executemany(
+                        "INSERT INTO sessions (user_id, data, last_activity) VALUES (?, ?, ?)", rows()
+                    )
+            except Exception:
+                # La escritura falló: conservar las marcas para el siguiente guardado
+                with self._dirty_lock:
+                    self._dirty |= dirty
+                raise
+    
+    def flush_dirty_sessions(self, filepath):
+        """
+        Guarda en la base de datos SQLite solo las sesiones que cambiaron desde el último
+        guardado: inserta o reemplaza sus filas y elimina las de sesiones finalizadas.
         
         Args:
-            filepath (str): Ruta del archivo donde guardar las sesiones
-        """
-        with self.lock:
-            # Convertir objetos datetime a strings para JSON
-            serializable_sessions = {}
-            for user_id, session in self.sessions.items():
-                serializable_session = session.copy()
-                serializable_session['created_at'] = session['created_at'].isoformat()
-                serializable_session['last_activity'] = session['last_activity'].isoformat()
-                serializable_sessions[user_id] = serializable_session
+            filepath (str): Ruta de la base de datos SQLite donde guardar las sesiones
+            
+        Returns:
+            int: Número de sesiones que se escribieron o se eliminaron
+        """
+        with self._save_lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+            
+            if not dirty:
+                return 0
+            
+            deletes = []
             
-            with open(filepath, 'w') as f:
-                json.dump(serializable_sessions, f, indent=2)
+            def upserts():
+                # Cada sesión se copia bajo el lock de su fragmento, se serializa fuera de él y
+                # se entrega a SQLite a medida que se genera, sin acumular todas las filas;
+                # las sesiones finalizadas se apartan para eliminarlas después
+                for user_id in dirty:
+                    lock, sessions = self._shard(user_id)
+                    with lock:
+                        session = sessions.get(user_id)
+                        snapshot = _snapshot_session(session) if session is not None else None
+                    
+                    if snapshot is None:
+                        deletes.append((user_id,))
+                    else:
+                        yield user_id, _serialize_session(snapshot), snapshot['last_activity']
+            
+            try:
+                db = self._db(filepath)
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO sessions (user_id, data, last_activity) VALUES (?, ?, ?)", upserts()
+                    )
+                    db.executemany("DELETE FROM sessions WHERE user_id = ?", deletes)
+            except Exception:
+                # La escritura falló: devolver las sesiones al conjunto pendiente para reintentarlas
+                with self._dirty_lock:
+                    self._dirty |= dirty
+                raise
+            return len(dirty)
     
     def load_sessions(self, filepath):
         """
-        Carga sesiones desde un archivo JSON.
+        Carga sesiones desde una base de datos SQLite. Las que ya habrían expirado se
+        eliminan de la base de datos sin restaurarlas ni notificar al usuario.
         
         Args:
-            filepath (str): Ruta del archivo desde donde cargar las sesiones
+            filepath (str): Ruta de la base de datos SQLite desde donde cargar las sesiones
         """
+        # Sin archivo no hay nada que cargar; conectarse crearía una base de datos vacía
+        if not os.path.exists(filepath):
+            return
+        
+        # last_activity se guarda como timestamp de time.time()
+        cutoff = time.time() - self.session_timeout
         try:
-            with open(filepath, 'r') as f:
-                loaded_sessions = json.load(f)
+            with self._save_lock:
+                db = self._db(filepath)
+                with db:
+                    db.execute("DELETE FROM sessions WHERE last_activity <= ?", (cutoff,))
+                rows = db.execute("SELECT user_id, data, last_activity FROM sessions").fetchall()
+        except sqlite3.DatabaseError as e:
+            # Archivo que no es una base de datos SQLite (p. ej. el sessions.json de versiones anteriores)
+            logging.error(f"Error al cargar sesiones: {str(e)}")
+            return
+        
+        for user_id, raw, last_activity in rows:
+            try:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # Si una fila está malformada, ignorar esa sesión
+                continue
             
-            with self.lock:
-                for user_id, session in loaded_sessions.items():
-                    # Convertir strings a objetos datetime
-                    session['created_at'] = datetime.fromisoformat(session['created_at'])
-                    session['last_activity'] = datetime.fromisoformat(session['last_activity'])
-                    
-                    # Asegurar que los campos de inactividad existan
-                    if 'inactivity_warning_sent' not in session:
-                        session['inactivity_warning_sent'] = False
-                    if 'closing_notice_sent' not in session:
-                        session['closing_notice_sent'] = False
-                        
-                    self.sessions[user_id] = session
-        except (FileNotFoundError, json.JSONDecodeError):
-            # Si el archivo no existe o está malformado, iniciar con sesiones vacías
-            pass
\ No newline at end of file
+            history = data.get('message_history')
+            if history:
+                history = deque(history, maxlen=self.max_history)
+            
+            # Convertir last_activity a un instante monotónico. El aviso de cierre se
+            # descarta: si quedó marcado antes de apagar, la sesión nunca se llegó a cerrar
+            session = Session(
+                created_at=data['created_at'],
+                last_activity=_wall_to_monotonic(last_activity),
+                state=data.get('state', 'INITIAL'),
+                context=data.get('context') or EMPTY_CONTEXT,
+                thread_id=data.get('thread_id'),
+                message_history=history or None,
+                inactivity_warning_sent=data.get('inactivity_warning_sent', False)
+            )
+            
+            lock, sessions = self._shard(user_id)
+            with lock:
+                sessions[user_id] = session
+                
+                # Programar la siguiente revisión según el estado de la sesión
+                last_activity = session.last_activity
+                if session.inactivity_warning_sent:
+                    self._schedule_check(user_id, last_activity + self.session_timeout)
+                else:
+                    self._schedule_check(user_id, last_activity + self.inactivity_warning)
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+# Event loop compartido por todos los hilos de Flask. Las corrutinas de los
+# distintos usuarios se ejecutan en este mismo loop, de modo que las esperas de
+# red (OpenAI, Odoo) de varias conversaciones se solapan en lugar de bloquear
+# un hilo cada una.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """
+    Devuelve el event loop compartido, iniciándolo en un hilo en segundo plano la primera vez.
+
+    Returns:
+        asyncio.AbstractEventLoop: Event loop en ejecución
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="asyncio-loop", daemon=True)
+            thread.start()
+    return _loop
+
+
+def run_coroutine(coro, timeout=None):
+    """
+    Ejecuta una corrutina en el event loop compartido desde código síncrono
+    (por ejemplo, una vista de Flask) y espera su resultado.
+
+    Args:
+        coro: Corrutina a ejecutar
+        timeout (float): Tiempo máximo de espera en segundos (None para esperar indefinidamente)
+
+    Returns:
+        El valor devuelto por la corrutina
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    return future.result(timeout)
@@ -1,59 +1,69 @@
+import atexit
 import logging
-from flask import current_app, jsonify
-import json
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 import os
-from app.services.openai_service import generate_response
-from app.services.session_manager import SessionManager
+import threading
+import asyncio
+import httpx
+from app.services.openai_service import generate_response, set_send_message_function
+from app.services.session_manager import SessionManager, EMPTY_CONTEXT
 from app.services.odoo_integration import create_odoo_ticket
+from app.utils.event_loop import run_coroutine, get_event_loop
 
 # Create a global instance of SessionManager
 # Set session timeout to 10 minutes (600 seconds)
 session_manager = SessionManager(session_timeout=600)
 
-def log_http_response(response):
-    logging.info(f"Status: {response.status_code}")
-    logging.info(f"Content-type: {response.headers.get('content-type')}")
-    logging.info(f"Body: {response.text}")
+# Restore the sessions saved by the previous run, then persist changed sessions to SQLite
+# every 30 seconds in the background and once more on shutdown
+SESSIONS_FILE = 'sessions.db'
+session_manager.load_sessions(SESSIONS_FILE)
+session_manager.start_autosave(SESSIONS_FILE, interval=30)
+atexit.register(session_manager.flush_dirty_sessions, SESSIONS_FILE)
 
-def get_text_message_input(recipient, text):
-    return json.dumps(
-        {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": recipient,
-            "type": "text",
-            "text": {"preview_url": False, "body": text},
-        }
-    )
+# Shared session for Graph API calls: keeps connections to graph.facebook.com
+# alive so each reply does not pay a new TCP/TLS handshake. Retries only cover
+# connection errors (urllib3 does not retry a POST that reached the server)
+_whatsapp_session = requests.Session()
+_whatsapp_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
 
-def send_message(data):
-    headers = {
-        "Content-type": "application/json",
-        "Authorization": f"Bearer {current_app.config['ACCESS_TOKEN']}",
-    }
-    url = f"https://graph.facebook.com/{current_app.config['VERSION']}/{current_app.config['PHONE_NUMBER_ID']}/messages"
-    try:
-        response = requests.post(
-            url, data=data, headers=headers, timeout=10
-        )
-        response.raise_for_status()
-    except requests.Timeout:
-        logging.error("Timeout occurred while sending message")
-        return jsonify({"status": "error", "message": "Request timed out"}), 408
-    except requests.RequestException as e:
-        logging.error(f"Request failed due to: {e}")
-        return jsonify({"status": "error", "message": "Failed to send message"}), 500
-    else:
-        log_http_response(response)
-        return response
+# Cliente asíncrono compartido para los envíos desde el event loop, con el mismo
+# propósito de reutilizar las conexiones
+_whatsapp_client = httpx.AsyncClient(
+    timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=50),
+)
+
+# The text message payload always has the same shape: only the recipient and the
+# body are JSON-encoded per call and spliced between these constant pieces
+_TEXT_MESSAGE_PREFIX = b'{"messaging_product":"whatsapp","recipient_type":"individual","to":'
+_TEXT_MESSAGE_MIDDLE = b',"type":"text","text":{"preview_url":false,"body":'
+_TEXT_MESSAGE_SUFFIX = b'}}'
+
+def get_text_message_input(recipient, text):
+    # Returns bytes, which requests and httpx send as the body unchanged
+    return b"".join((
+        _TEXT_MESSAGE_PREFIX, orjson.dumps(recipient),
+        _TEXT_MESSAGE_MIDDLE, orjson.dumps(text),
+        _TEXT_MESSAGE_SUFFIX,
+    ))
 
 # Almacenar estos valores globalmente para que estén disponibles fuera del contexto de la aplicación
 whatsapp_config = {
     'access_token': None,
     'version': None,
-    'phone_number_id': None
+    'phone_number_id': None,
+    # URL y cabeceras de la Graph API, construidas una sola vez a partir de los valores anteriores
+    'url': None,
+    'headers': None
 }
 
 def init_whatsapp_config(app):
@@ -65,6 +75,11 @@ def init_whatsapp_config(app):
         whatsapp_config['access_token'] = app.config['ACCESS_TOKEN']
         whatsapp_config['version'] = app.config['VERSION']
         whatsapp_config['phone_number_id'] = app.config['PHONE_NUMBER_ID']
+        whatsapp_config['url'] = f"https://graph.facebook.com/{whatsapp_config['version']}/{whatsapp_config['phone_number_id']}/messages"
+        whatsapp_config['headers'] = {
+            "Content-type": "application/json",
+            "Authorization": f"Bearer {whatsapp_config['access_token']}",
+        }
         logging.info("Configuración de WhatsApp inicializada para uso en hilos separados")
 
 def send_whatsapp_message_background(recipient, text):
@@ -74,38 +89,99 @@ def send_whatsapp_message_background(recipient, text):
     """
     message_data = get_text_message_input(recipient, text)
     
-    headers = {
-        "Content-type": "application/json",
-        "Authorization": f"Bearer {whatsapp_config['access_token']}",
-    }
-    url = f"https://graph.facebook.com/{whatsapp_config['version']}/{whatsapp_config['phone_number_id']}/messages"
+    try:
+        response = _whatsapp_session.post(
+            whatsapp_config['url'], data=message_data, headers=whatsapp_config['headers'], timeout=10
+        )
+        response.raise_for_status()
+        logging.info(f"Mensaje en segundo plano enviado a {recipient}")
+        return response
+    except Exception as e:
+        logging.error(f"Error al enviar mensaje en segundo plano: {str(e)}")
+        return None
+
+async def send_whatsapp_message_async(recipient, text):
+    """
+    Versión asíncrona de send_whatsapp_message_background. Se ejecuta en el event loop
+    compartido, de modo que los envíos pendientes no ocupan un hilo cada uno.
+    
+    Args:
+        recipient (str): ID de WhatsApp del destinatario
+        text (str): Texto del mensaje
+        
+    Returns:
+        httpx.Response: Respuesta de la API, o None si el envío falló
+    """
+    message_data = get_text_message_input(recipient, text)
     
     try:
-        response = requests.post(
-            url, data=message_data, headers=headers, timeout=10
+        response = await _whatsapp_client.post(
+            whatsapp_config['url'], content=message_data, headers=whatsapp_config['headers']
         )
         response.raise_for_status()
-        logging.info(f"Mensaje de inactividad enviado a {recipient}")
+        logging.info(f"Mensaje enviado a {recipient}")
         return response
     except Exception as e:
-        logging.error(f"Error al enviar mensaje de inactividad: {str(e)}")
+        logging.error(f"Error al enviar mensaje: {str(e)}")
         return None
 
+async def close_whatsapp_client():
+    """
+    Cierra el cliente HTTP asíncrono compartido de la Graph API.
+    """
+    await _whatsapp_client.aclose()
+
+# Las respuestas se envían en el event loop compartido para que el webhook no espere a la
+# Graph API. El semáforo limita los envíos pendientes: si se llena, el webhook espera
+# a que se libere un hueco en lugar de acumular mensajes sin límite en memoria
+MAX_PENDING_SENDS = 256
+_send_slots = threading.BoundedSemaphore(MAX_PENDING_SENDS)
+
+def queue_whatsapp_message(recipient, text):
+    """
+    Encola el envío de un mensaje de WhatsApp y regresa sin esperar la respuesta de la API.
+    
+    Args:
+        recipient (str): ID de WhatsApp del destinatario
+        text (str): Texto del mensaje
+        
+    Returns:
+        concurrent.futures.Future: Futuro con el resultado de send_whatsapp_message_async
+    """
+    _send_slots.acquire()
+    future = asyncio.run_coroutine_threadsafe(
+        send_whatsapp_message_async(recipient, text), get_event_loop()
+    )
+    future.add_done_callback(lambda _: _send_slots.release())
+    return future
+
 # Configurar la función de envío de mensajes en el SessionManager
 session_manager.set_send_message_function(send_whatsapp_message_background)
 
+# Y en el servicio de OpenAI, para confirmar los tickets creados en segundo plano
+set_send_message_function(send_whatsapp_message_background)
+
+# Citation brackets added by the assistant, e.g. 【4:0†source】
+_BRACKET_RE = re.compile(r"\【.*?\】")
+# Double asterisks including the word(s) in between
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+
 def process_text_for_whatsapp(text):
     # Remove brackets
-    pattern = r"\【.*?\】"
-    # Substitute the pattern with an empty string
-    text = re.sub(pattern, "", text).strip()
-    # Pattern to find double asterisks including the word(s) in between
-    pattern = r"\*\*(.*?)\*\*"
-    # Replacement pattern with single asterisks
-    replacement = r"*\1*"
-    # Substitute occurrences of the pattern with the replacement
-    whatsapp_style_text = re.sub(pattern, replacement, text)
-    return whatsapp_style_text
+    text = _BRACKET_RE.sub("", text).strip()
+    # Replace double asterisks with WhatsApp's single asterisks
+    return _BOLD_RE.sub(r"*\1*", text)
+
+# Palabras clave que podrían indicar la intención de crear un ticket
+TICKET_KEYWORDS = [
+    "problema", "error", "falla", "ticket", "ayuda", "soporte", "no funciona",
+    "issue", "bug", "help", "support", "not working", "broken", "doesn't work",
+    "reportar", "reporte", "report", "queja", "complaint"
+]
+
+# Una sola expresión con todas las palabras clave: el mensaje se recorre una vez en C
+# en lugar de hacer una búsqueda en Python por cada palabra
+_TICKET_INTENT_RE = re.compile("|".join(re.escape(keyword) for keyword in TICKET_KEYWORDS))
 
 def detect_ticket_intent(message):
     """
@@ -117,21 +193,94 @@ def detect_ticket_intent(message):
     Returns:
         bool: True si se detecta intención de crear ticket, False en caso contrario
     """
-    # Palabras clave que podrían indicar la intención de crear un ticket
-    ticket_keywords = [
-        "problema", "error", "falla", "ticket", "ayuda", "soporte", "no funciona",
-        "issue", "bug", "help", "support", "not working", "broken", "doesn't work",
-        "reportar", "reporte", "report", "queja", "complaint"
-    ]
+    return _TICKET_INTENT_RE.search(message.lower()) is not None
+
+# Respuestas reconocidas en el flujo de conversación (comparadas en minúsculas)
+_EXIT_WORDS = frozenset({'finalizar', 'terminar', 'cerrar', 'adios', 'chao', 'bye', 'end', 'fin', 'salir', 'exit'})
+_GREETINGS = frozenset({'hola', 'hi', 'hello'})
+_NEGATIVE = frozenset({'no', 'nop', 'nope', 'negativo', 'n'})
+_SKIP_EMAIL = frozenset({'no', 'n', 'paso', 'skip', 'omitir'})
+_AFFIRM = frozenset({'si', 'sí', 'yes', 'confirmar', 'aceptar', 'ok'})
+
+# Validación básica de correo: se rechaza en local lo que Odoo rechazaría de todos modos
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Pasos del proceso de creación de ticket. Cada función recibe el mensaje (original y en
+# minúsculas), el contexto de la sesión, el wa_id y el nombre del usuario, y devuelve
+# (respuesta, nuevo_estado). Si nuevo_estado es None el proceso continúa con el
+# contexto actualizado; en otro caso la sesión pasa a ese estado con el contexto vacío.
+
+def _ticket_step_subject(message_body, message_lower, context, wa_id, name):
+    """
+    Paso 1: Recopilar el asunto/título del ticket.
+    """
+    context['ticket_subject'] = message_body
+    context['ticket_step'] = 'description'
+    return "Gracias. Por favor describe el problema en detalle.", None
+
+def _ticket_step_description(message_body, message_lower, context, wa_id, name):
+    """
+    Paso 2: Recopilar la descripción detallada.
+    """
+    context['ticket_description'] = message_body
+    context['ticket_step'] = 'email'
+    return "Gracias por la información. Para poder dar seguimiento a tu caso, ¿podrías proporcionarme tu correo electrónico? (es importante agregarlo para darle un seguimiento apropiado).", None
+
+def _ticket_step_email(message_body, message_lower, context, wa_id, name):
+    """
+    Paso 3: Solicitar email del cliente y mostrar el resumen para confirmar.
+    """
+    # Verificar si es un email válido o el usuario prefirió no compartirlo
+    if message_lower in _SKIP_EMAIL:
+        context['ticket_email'] = ""
+    elif _EMAIL_RE.match(message_body.strip()):
+        context['ticket_email'] = message_body.strip()
+    else:
+        # Seguir en el paso 'email' hasta recibir un correo válido o una negativa
+        return "Ese correo no parece válido. Por favor, inténtalo de nuevo o responde 'no' si prefieres no compartirlo.", None
+    
+    context['ticket_step'] = 'confirmation'
+    
+    # Mostrar resumen y pedir confirmación
+    email_info = f"*Email:* {context['ticket_email']}" if context['ticket_email'] else "*Email:* No proporcionado"
+    response = (
+        "Por favor, confirma los detalles del ticket:\n\n"
+        f"*Asunto:* {context['ticket_subject']}\n"
+        f"*Descripción:* {context['ticket_description']}\n"
+        f"{email_info}\n\n"
+        "¿Deseas crear este ticket? (responde 'sí' o 'no')"
+    )
+    return response, None
+
+def _ticket_step_confirmation(message_body, message_lower, context, wa_id, name):
+    """
+    Paso 4: Confirmar y crear el ticket.
+    """
+    if message_lower not in _AFFIRM:
+        return "Ticket cancelado. ¿En qué más puedo ayudarte?", 'AWAITING_QUERY'
     
-    message_lower = message.lower()
+    # Crear el ticket en Odoo
+    ticket_result = create_odoo_ticket(
+        customer_name=name,
+        customer_phone=wa_id,
+        customer_email=context.get('ticket_email', ""),
+        subject=context['ticket_subject'],
+        description=context['ticket_description']
+    )
     
-    # Buscar coincidencias con palabras clave
-    for keyword in ticket_keywords:
-        if keyword in message_lower:
-            return True
+    if ticket_result.get('success', False):
+        # Cambiar a estado de espera post-ticket
+        return "¡Ticket creado con éxito! Un agente de soporte se pondrá en contacto contigo pronto. ¿Necesitas ayuda con algo más? (responde 'sí' o 'no')", 'AWAITING_RESPONSE_POST_TICKET'
     
-    return False
+    error_msg = ticket_result.get('error', 'Error desconocido')
+    return f"Lo siento, hubo un problema al crear el ticket: {error_msg}. Por favor, inténtalo más tarde o contacta directamente con soporte.", 'AWAITING_QUERY'
+
+_TICKET_STEP_HANDLERS = {
+    'subject': _ticket_step_subject,
+    'description': _ticket_step_description,
+    'email': _ticket_step_email,
+    'confirmation': _ticket_step_confirmation,
+}
 
 def close_session_with_message(wa_id, name):
     """
@@ -144,8 +293,7 @@ def close_session_with_message(wa_id, name):
     farewell_message = f"Gracias por contactarnos, {name}. Tu sesión ha sido finalizada. Si necesitas ayuda adicional en el futuro, no dudes en escribirnos nuevamente. ¡Que tengas un excelente día!"
     
     # Enviar mensaje de despedida
-    data = get_text_message_input(wa_id, farewell_message)
-    send_message(data)
+    queue_whatsapp_message(wa_id, farewell_message)
     
     # Registrar el mensaje en el historial antes de cerrar la sesión
     session_manager.add_message_to_history(wa_id, 'assistant', farewell_message)
@@ -155,11 +303,14 @@ def close_session_with_message(wa_id, name):
     logging.info(f"Sesión cerrada voluntariamente para {name} ({wa_id})")
 
 def process_whatsapp_message(body):
-    # Extract user information
-    wa_id = body["entry"][0]["changes"][0]["value"]["contacts"][0]["wa_id"]
-    name = body["entry"][0]["changes"][0]["value"]["contacts"][0]["profile"]["name"]
-    message = body["entry"][0]["changes"][0]["value"]["messages"][0]
+    # Extract user information, walking the nested payload only once
+    value = body["entry"][0]["changes"][0]["value"]
+    contact = value["contacts"][0]
+    wa_id = contact["wa_id"]
+    name = contact["profile"]["name"]
+    message = value["messages"][0]
     message_body = message["text"]["body"]
+    message_lower = message_body.lower()
     
     # Get or create session for this user
     session = session_manager.get_session(wa_id)
@@ -168,19 +319,19 @@ def process_whatsapp_message(body):
     session_manager.add_message_to_history(wa_id, 'user', message_body)
     
     # Verificar si el usuario quiere finalizar la conversación
-    if message_body.lower() in ['finalizar', 'terminar', 'cerrar', 'adios', 'chao', 'bye', 'end', 'fin', 'salir', 'exit']:
+    if message_lower in _EXIT_WORDS:
         close_session_with_message(wa_id, name)
         return
     
     # Process based on session state
-    if session['state'] == 'INITIAL' and message_body.lower() in ['hola', 'hi', 'hello']:
+    if session.state == 'INITIAL' and message_lower in _GREETINGS:
         # Welcome message for new users
         response = f"¡Hola {name}! Bienvenido. ¿En qué puedo ayudarte hoy?"
         session_manager.update_session(wa_id, state='AWAITING_QUERY')
     
-    elif session['state'] == 'AWAITING_RESPONSE_POST_TICKET':
+    elif session.state == 'AWAITING_RESPONSE_POST_TICKET':
         # Estado especial después de crear un ticket cuando se pregunta si necesita ayuda adicional
-        if message_body.lower() in ['no', 'nop', 'nope', 'negativo', 'n']:
+        if message_lower in _NEGATIVE:
             # El usuario no necesita más ayuda, cerrar la sesión
             close_session_with_message(wa_id, name)
             return
@@ -189,79 +340,27 @@ def process_whatsapp_message(body):
             response = "¿En qué más puedo ayudarte?"
             session_manager.update_session(wa_id, state='AWAITING_QUERY')
     
-    elif session['state'] == 'TICKET_CREATION':
+    elif session.state == 'TICKET_CREATION':
         # Proceso de creación de ticket en múltiples pasos
-        context = session['context']
+        # El contexto inicial es compartido y de solo lectura: trabajar sobre un dict propio
+        context = dict(session.context)
+        handler = _TICKET_STEP_HANDLERS.get(context.get('ticket_step', 'subject'))
         
-        # Paso 1: Recopilar el asunto/título del ticket
-        if 'ticket_step' not in context or context['ticket_step'] == 'subject':
-            context['ticket_subject'] = message_body
-            context['ticket_step'] = 'description'
-            response = "Gracias. Por favor describe el problema en detalle."
-        
-        # Paso 2: Recopilar la descripción detallada
-        elif context['ticket_step'] == 'description':
-            context['ticket_description'] = message_body
-            context['ticket_step'] = 'email'
-            response = "Gracias por la información. Para poder dar seguimiento a tu caso, ¿podrías proporcionarme tu correo electrónico? (es importante agregarlo para darle un seguimiento apropiado)."
-        
-        # Paso 3: Solicitar email del cliente
-        elif context['ticket_step'] == 'email':
-            # Verificar si es un email válido o el usuario prefirió no compartirlo
-            if message_body.lower() in ['no', 'n', 'paso', 'skip', 'omitir']:
-                context['ticket_email'] = ""
-            else:
-                context['ticket_email'] = message_body
-            
-            context['ticket_step'] = 'confirmation'
-            
-            # Mostrar resumen y pedir confirmación
-            email_info = f"*Email:* {context['ticket_email']}" if context['ticket_email'] else "*Email:* No proporcionado"
-            response = (
-                "Por favor, confirma los detalles del ticket:\n\n"
-                f"*Asunto:* {context['ticket_subject']}\n"
-                f"*Descripción:* {context['ticket_description']}\n"
-                f"{email_info}\n\n"
-                "¿Deseas crear este ticket? (responde 'sí' o 'no')"
-            )
-        
-        # Paso 4: Confirmar y crear el ticket
-        elif context['ticket_step'] == 'confirmation':
-            if message_body.lower() in ['si', 'sí', 'yes', 'confirmar', 'aceptar', 'ok']:
-                # Crear el ticket en Odoo
-                ticket_result = create_odoo_ticket(
-                    customer_name=name,
-                    customer_phone=wa_id,
-                    customer_email=context.get('ticket_email', ""),
-                    subject=context['ticket_subject'],
-                    description=context['ticket_description']
-                )
-                
-                if ticket_result.get('success', False):
-                    response = "¡Ticket creado con éxito! Un agente de soporte se pondrá en contacto contigo pronto. ¿Necesitas ayuda con algo más? (responde 'sí' o 'no')"
-                    # Cambiar a estado de espera post-ticket
-                    session_manager.update_session(wa_id, state='AWAITING_RESPONSE_POST_TICKET', context={})
-                else:
-                    error_msg = ticket_result.get('error', 'Error desconocido')
-                    response = f"Lo siento, hubo un problema al crear el ticket: {error_msg}. Por favor, inténtalo más tarde o contacta directamente con soporte."
-                    # Restablecer el estado para nuevas consultas
-                    session_manager.update_session(wa_id, state='AWAITING_QUERY', context={})
-            else:
-                response = "Ticket cancelado. ¿En qué más puedo ayudarte?"
-                # Restablecer el estado para nuevas consultas
-                session_manager.update_session(wa_id, state='AWAITING_QUERY', context={})
-        
-        else:
+        if handler is None:
             # Si por alguna razón el paso no está definido correctamente
             response = "Lo siento, hubo un problema con el proceso de creación del ticket. ¿Puedes intentarlo de nuevo?"
-            session_manager.update_session(wa_id, state='AWAITING_QUERY', context={})
+            new_state = 'AWAITING_QUERY'
+        else:
+            response, new_state = handler(message_body, message_lower, context, wa_id, name)
         
-        # Actualizar el contexto
-        if session['state'] == 'TICKET_CREATION':  # Solo si no hemos cambiado de estado
+        if new_state is None:
+            # Seguimos en el mismo proceso: actualizar el contexto
             session_manager.update_session(wa_id, context=context)
+        else:
+            session_manager.update_session(wa_id, state=new_state, context=EMPTY_CONTEXT)
     
     # Check if message indicates ticket creation intent
-    elif detect_ticket_intent(message_body) and session['state'] != 'TICKET_CREATION':
+    elif detect_ticket_intent(message_body) and session.state != 'TICKET_CREATION':
         response = "Parece que necesitas ayuda con un problema. Me gustaría crear un tiquet de soporte para que nuestro equipo pueda asistirte. Por favor, proporciona un breve título que describa el problema:"
         session_manager.update_session(
             wa_id, 
@@ -272,10 +371,11 @@ def process_whatsapp_message(body):
     else:
         # For any other state or message, process with OpenAI
         # Use thread_id if available to maintain conversation
-        thread_id = session.get('thread_id')
+        thread_id = session.thread_id
         
         # Call your existing OpenAI integration with context preserved
-        response = generate_response(message_body, wa_id, name)
+        # generate_response es asíncrona: se ejecuta en el event loop compartido
+        response = run_coroutine(generate_response(message_body, wa_id, name))
         
         # Check if we should update session with a new thread_id
         # If your generate_response returns a thread_id, you can save it:
@@ -288,22 +388,18 @@ def process_whatsapp_message(body):
     # Add response to history
     session_manager.add_message_to_history(wa_id, 'assistant', response)
     
-    # Send response to WhatsApp
-    data = get_text_message_input(wa_id, response)
-    send_message(data)
-    
-    # Periodically save sessions
-    session_manager.save_sessions('sessions.json')
+    # Send response to WhatsApp without blocking the webhook
+    queue_whatsapp_message(wa_id, response)
 
 def is_valid_whatsapp_message(body):
     """
     Check if the incoming webhook event has a valid WhatsApp message structure.
     """
-    return (
-        body.get("object")
-        and body.get("entry")
-        and body["entry"][0].get("changes")
-        and body["entry"][0]["changes"][0].get("value")
-        and body["entry"][0]["changes"][0]["value"].get("messages")
-        and body["entry"][0]["changes"][0]["value"]["messages"][0]
-    )
\ No newline at end of file
+    if not body.get("object"):
+        return False
+    # Valid messages are almost all of the traffic: walk the path once and let
+    # a missing or malformed level fall through to the except
+    try:
+        return bool(body["entry"][0]["changes"][0]["value"]["messages"][0])
+    except (KeyError, IndexError, TypeError):
+        return False
\ No newline at end of file